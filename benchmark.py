@@ -0,0 +1,276 @@
+# Benchmark and load-test suite for the generate pipeline
+#
+#   python benchmark.py                      # micro + Flask test client load
+#   python benchmark.py --gunicorn           # also load-test a local gunicorn
+#   python benchmark.py --update-baseline    # store results as the new baseline
+#
+# Runs fully offline: the LLM path is disabled and all SQLite state goes to a
+# temporary directory. Results are written as JSON and compared against
+# benchmark_baseline.json; the exit code is 1 if anything regressed by more
+# than --tolerance.
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import tracemalloc
+import urllib.request
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmark_baseline.json')
+
+# File locations and actions of a run, not settings that shape its numbers;
+# kept out of stored results so the baseline has no machine-local paths
+RUN_ONLY_ARGS = ('output', 'baseline', 'update_baseline')
+
+SAMPLE_INPUT = ('Apex Legends ranked tips', 'gaming', 'Apex Legends', 'gamers')
+
+def isolate_environment(workdir):
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['PROFILE_DIR'] = os.path.join(workdir, 'profiles')
+    os.environ['LLM_MODE'] = 'off'
+    # Load tests hammer one client on purpose
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ.pop('OPENAI_API_KEY', None)
+    os.environ.pop('HASHTAG_SOURCE', None)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(latencies, elapsed, errors):
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3)
+    }
+
+def bench_micro(app_module, iterations, repeats):
+    generate = app_module.generate_ultimate_strategy
+    for _ in range(min(iterations, 200)):
+        generate(*SAMPLE_INPUT)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            generate(*SAMPLE_INPUT)
+        timings.append((time.perf_counter() - start) / iterations)
+    per_call = statistics.median(timings)
+
+    # Allocation cost of a single call: peak traced bytes and blocks kept
+    tracemalloc.start()
+    peaks = []
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(200):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        generate(*SAMPLE_INPUT)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    retained_blocks = (sys.getallocatedblocks() - blocks_before) / 200
+    tracemalloc.stop()
+
+    return {
+        "calls_per_sec": round(1 / per_call, 1),
+        "us_per_call": round(per_call * 1e6, 2),
+        "peak_alloc_bytes_per_call": int(statistics.median(peaks)),
+        "retained_blocks_per_call": round(retained_blocks, 2)
+    }
+
+def run_load(send, total, concurrency):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        ok = send(i)
+        latency = time.perf_counter() - start
+        with lock:
+            latencies.append(latency)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return latency_summary(latencies, time.perf_counter() - start, errors)
+
+def form_for(i):
+    # Unique intents so every request runs the full generation pipeline
+    intent, category, game_industry, audience = SAMPLE_INPUT
+    return {"intent": f"{intent} #{i}", "category": category, "game_industry": game_industry, "audience": audience}
+
+def bench_test_client(app_module, total, concurrency):
+    client = app_module.app.test_client()
+
+    def home(i):
+        with client.get('/', headers={'Accept-Encoding': 'gzip, br'}) as response:
+            return response.status_code == 200
+
+    def generate(i):
+        # The page streams, so generation only runs while the body is read
+        with client.post('/generate', data=form_for(i)) as response:
+            response.get_data()
+            return response.status_code == 200
+
+    return {
+        "home": run_load(home, total, concurrency),
+        "generate": run_load(generate, total, concurrency)
+    }
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def bench_gunicorn(total, concurrency, workers):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{port}', '-w', str(workers), '--log-level', 'warning'],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base + '/', timeout=1).read()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.2)
+
+        def request(path, data=None):
+            try:
+                body = urllib.parse.urlencode(data).encode() if data else None
+                with urllib.request.urlopen(base + path, data=body, timeout=30) as response:
+                    response.read()
+                    return response.status == 200
+            except OSError:
+                return False
+
+        return {
+            "workers": workers,
+            "home": run_load(lambda i: request('/'), total, concurrency),
+            "generate": run_load(lambda i: request('/generate', form_for(i)), total, concurrency)
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def higher_is_better(name):
+    return name.endswith('_per_sec')
+
+def lower_is_better(name):
+    # Load-test percentiles are queueing-dominated and too noisy to gate on;
+    # they are reported, and throughput is gated instead
+    return name.endswith(('us_per_call', '_bytes_per_call'))
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    current, previous = flatten(results["benchmarks"]), flatten(baseline["benchmarks"])
+    for name, value in sorted(current.items()):
+        old = previous.get(name)
+        if old is None:
+            continue
+        if name.endswith('errors'):
+            if value > old:
+                regressions.append(f"{name}: {value} > baseline {old}")
+        elif not old:
+            continue
+        elif higher_is_better(name) and value < old * (1 - tolerance):
+            regressions.append(f"{name}: {value} < baseline {old}")
+        elif lower_is_better(name) and value > old * (1 + tolerance):
+            regressions.append(f"{name}: {value} > baseline {old}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="E-Volve.ai generate pipeline benchmarks")
+    parser.add_argument('--iterations', type=int, default=2000, help="calls per micro-benchmark repeat")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=500, help="requests per load-test scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--gunicorn', action='store_true', help="also load-test a local gunicorn instance")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.35, help="allowed relative regression")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='evolve-bench-')
+    isolate_environment(workdir)
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    print("🚀 Running E-Volve.ai benchmarks...")
+    benchmarks = {"micro": {"generate_ultimate_strategy": bench_micro(app_module, args.iterations, args.repeats)}}
+    print(f"📊 Micro: {benchmarks['micro']['generate_ultimate_strategy']}")
+    benchmarks["test_client"] = bench_test_client(app_module, args.requests, args.concurrency)
+    print(f"📊 Test client: {benchmarks['test_client']}")
+    if args.gunicorn:
+        benchmarks["gunicorn"] = bench_gunicorn(args.requests, args.concurrency, args.workers)
+        print(f"📊 Gunicorn: {benchmarks['gunicorn']}")
+
+    results = {
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {name: value for name, value in vars(args).items() if name not in RUN_ONLY_ARGS},
+        "benchmarks": benchmarks
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ No baseline found - run with --update-baseline to create one")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("🔥 Regressions against baseline:")
+        for regression in regressions:
+            print(f"  • {regression}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# Hashtag index
+# Every (category, audience) pair maps to a precomputed cumulative weight table,
+# so picking k hashtags is k bisects instead of rebuilding and shuffling the
+# pool per request. Weights come from the viral model's hashtag scores, which
+# learn from stored performance data. The vocabulary can be hot-reloaded from
+# a JSON file; a background thread per worker rebuilds the tables when the
+# file or the model changes.
+import os
+import json
+import math
+import time
+import random
+import bisect
+import threading
+
+from viral_score import viral_model, featurize
+
+HASHTAG_SOURCE = os.getenv('HASHTAG_SOURCE')
+REFRESH_INTERVAL = float(os.getenv('HASHTAG_REFRESH_INTERVAL', 60))
+TEMPERATURE = float(os.getenv('HASHTAG_TEMPERATURE', 5))
+SAMPLE_SIZE = 12
+
+DEFAULT_VOCABULARY = {
+    "trending": ["#fyp", "#viral", "#trending", "#contentcreator"],
+    "branded": ["#lvxlabs", "#metafyzical", "#evolveai", "#cleanenergy"],
+    "categories": {
+        "gaming": ["#gaming", "#gamer", "#esports", "#streamer"],
+        "fitness": ["#fitness", "#supplements", "#health", "#wellness"],
+        "business": ["#entrepreneur", "#business", "#productivity"],
+        "lifestyle": ["#lifestyle", "#motivation", "#selfcare"],
+        "product": ["#productreview", "#honest", "#supplement"]
+    },
+    "audiences": {
+        "gamers": ["#gamingcommunity", "#twitch"],
+        "fitness": ["#gymtok", "#fitfam"],
+        "entrepreneurs": ["#startup", "#hustle"],
+        "students": ["#studytok", "#studentlife"],
+        "general": []
+    },
+    "weights": {}
+}
+
+def load_vocabulary(path=None):
+    vocabulary = dict(DEFAULT_VOCABULARY)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            vocabulary.update(json.load(f))
+    return vocabulary
+
+class HashtagTable:
+    def __init__(self, tags, scores, base_weights):
+        self.tags = tags
+        self.scores = dict(zip(tags, scores))
+        weights = [base_weights.get(tag, 1.0) * math.exp((score - 85) / TEMPERATURE)
+                   for tag, score in zip(tags, scores)]
+        self.cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+        self.by_weight = sorted(range(len(tags)), key=lambda i: -weights[i])
+        self.inverse_weights = [1 / weight for weight in weights]
+
+    def sample(self, k):
+        k = min(k, len(self.tags))
+        if 2 * k > len(self.tags):
+            # Taking most of the pool: bisect draws would mostly collide, so
+            # use weighted random keys (Efraimidis-Spirakis) instead
+            inverse = self.inverse_weights
+            keys = [random.random() ** inverse[i] for i in range(len(inverse))]
+            chosen = sorted(range(len(keys)), key=keys.__getitem__, reverse=True)[:k]
+            return [self.tags[i] for i in chosen]
+
+        # Weighted sampling without replacement: bisect draws, rejecting
+        # repeats, then top up by weight if the draws keep colliding
+        chosen, seen = [], set()
+        for _ in range(4 * k):
+            if len(chosen) == k:
+                break
+            i = bisect.bisect_right(self.cumulative, random.random() * self.total)
+            if i not in seen:
+                seen.add(i)
+                chosen.append(i)
+        for i in self.by_weight:
+            if len(chosen) == k:
+                break
+            if i not in seen:
+                seen.add(i)
+                chosen.append(i)
+        return [self.tags[i] for i in chosen]
+
+class HashtagIndex:
+    def __init__(self, source=HASHTAG_SOURCE):
+        self.source = source
+        self.vocabulary = DEFAULT_VOCABULARY
+        self.tables = {}
+        self.builds = 0
+        self._source_mtime = None
+        self._model_observations = None
+        self._refresher_pid = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _source_changed(self):
+        if not self.source:
+            return False
+        try:
+            return os.path.getmtime(self.source) != self._source_mtime
+        except OSError:
+            return False
+
+    def reload(self):
+        if self.source:
+            try:
+                self._source_mtime = os.path.getmtime(self.source)
+                self.vocabulary = load_vocabulary(self.source)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Hashtag source {self.source} not loaded: {e}")
+        self._model_observations = viral_model.observations
+        vocabulary = self.vocabulary
+        tables = {}
+        for category in list(vocabulary["categories"]) + ['']:
+            for audience in list(vocabulary["audiences"]) + ['']:
+                tables[(category, audience)] = self._build(category, audience)
+        # Swapped in whole so readers never see a half-built index
+        self.tables = tables
+        self.builds += 1
+
+    def _pool(self, category, audience):
+        vocabulary = self.vocabulary
+        tags = list(vocabulary["trending"])
+        tags += vocabulary["categories"].get(category, [])
+        tags += vocabulary["audiences"].get(audience, [])
+        tags += vocabulary["branded"]
+        return tuple(dict.fromkeys(tags))
+
+    def _build(self, category, audience):
+        tags = self._pool(category, audience)
+        scores = viral_model.score(featurize([('hashtag', tag) for tag in tags], category, audience))
+        return HashtagTable(tags, scores.tolist(), self.vocabulary.get("weights", {}))
+
+    def table(self, category, audience):
+        self._ensure_refresher()
+        vocabulary = self.vocabulary
+        # Unknown free-text categories and audiences share the default tables
+        key = (category if category in vocabulary["categories"] else '',
+               audience if audience in vocabulary["audiences"] else '')
+        table = self.tables.get(key)
+        if table is None:
+            table = self._build(*key)
+            self.tables[key] = table
+        return table
+
+    def sample(self, category, audience, k=SAMPLE_SIZE):
+        table = self.table(category, audience)
+        tags = table.sample(k)
+        return tags, [table.scores[tag] for tag in tags]
+
+    def _ensure_refresher(self):
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            threading.Thread(target=self._refresh_loop, name='evolve-hashtag-refresh', daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(REFRESH_INTERVAL)
+            if self._source_changed() or viral_model.observations != self._model_observations:
+                self.reload()
+                print("#️⃣ Hashtag index reloaded")
+
+hashtag_index = HashtagIndex()
@@ -0,0 +1,202 @@
+# Async generation jobs
+# Submissions are stored in the jobs table and answered with a job ID right
+# away. A small pool of threads in each worker claims queued jobs with an
+# atomic UPDATE, so a burst of requests queues in SQLite instead of holding
+# request workers. Queued jobs survive restarts, and jobs a dead worker left
+# running are queued again once their lease expires.
+import os
+import json
+import time
+import uuid
+import threading
+
+from metrics import metrics
+from persistence import get_connection, reserve_connections, transaction
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_QUEUE_LIMIT = int(os.getenv('JOB_QUEUE_LIMIT', 1000))
+JOB_LEASE_TIMEOUT = float(os.getenv('JOB_LEASE_TIMEOUT', 120))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', 86400))
+JOB_RETRY_AFTER = int(os.getenv('JOB_RETRY_AFTER', 5))
+JOB_EVENTS_TIMEOUT = float(os.getenv('JOB_EVENTS_TIMEOUT', 30))
+MAINTENANCE_INTERVAL = 30
+KEEPALIVE_INTERVAL = 15
+
+# The queue limit is checked in the same statement as the insert, so
+# concurrent submissions across workers can never overshoot it
+INSERT_JOB_SQL = '''INSERT INTO jobs (job_id, user_id, status, payload, attempts, created_at)
+    SELECT ?, ?, 'queued', ?, 0, ?
+    WHERE (SELECT COUNT(*) FROM jobs WHERE status = 'queued') < ?'''
+
+CLAIM_JOB_SQL = '''UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, started_at = ?, lease_expires_at = ?
+    WHERE job_id = (SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+    RETURNING job_id, user_id, payload, created_at'''
+
+FINISH_JOB_SQL = '''UPDATE jobs
+    SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL
+    WHERE status = 'running' AND job_id = ?'''
+
+REQUEUE_EXPIRED_SQL = '''UPDATE jobs
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+        error = CASE WHEN attempts >= :max_attempts THEN 'job was interrupted too many times' ELSE error END,
+        finished_at = CASE WHEN attempts >= :max_attempts THEN :now ELSE NULL END,
+        lease_expires_at = NULL
+    WHERE status = 'running' AND lease_expires_at < :now'''
+
+PURGE_JOBS_SQL = "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?"
+
+SELECT_JOB_SQL = '''SELECT status, result, error, attempts, created_at, started_at, finished_at
+    FROM jobs WHERE job_id = ?'''
+
+QUEUE_POSITION_SQL = "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?"
+
+FINISHED = ('done', 'failed')
+
+class JobQueue:
+    def __init__(self, handler, workers=JOB_WORKERS):
+        # handler(payload, user_id) returns the job's JSON-serializable result
+        self.handler = handler
+        self.workers = workers
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._changed = threading.Condition()
+        self._last_maintenance = 0
+
+    def ensure_workers(self):
+        # One pool per process; JOB_WORKERS=0 makes a process submit-only
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            self._changed = threading.Condition()
+            reserve_connections(self.workers)
+            for i in range(self.workers):
+                threading.Thread(target=self._work_loop, name=f'evolve-job-worker-{i}', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, payload, user_id=None):
+        # Returns the new job ID, or None when the queue is full
+        self.ensure_workers()
+        job_id = uuid.uuid4().hex
+        with get_connection() as conn, transaction(conn):
+            inserted = conn.execute(INSERT_JOB_SQL, (job_id, user_id, json.dumps(payload), time.time(), JOB_QUEUE_LIMIT)).rowcount
+        if not inserted:
+            metrics.inc('evolve_jobs_total', outcome='rejected')
+            return None
+        metrics.inc('evolve_jobs_total', outcome='submitted')
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        with get_connection() as conn:
+            row = conn.execute(SELECT_JOB_SQL, (job_id,)).fetchone()
+            if row is None:
+                return None
+            status, result, error, attempts, created_at, started_at, finished_at = row
+            job = {
+                "job_id": job_id,
+                "status": status,
+                "attempts": attempts,
+                "created_at": created_at,
+                "started_at": started_at,
+                "finished_at": finished_at
+            }
+            if status == 'queued':
+                job["position"] = conn.execute(QUEUE_POSITION_SQL, (created_at,)).fetchone()[0]
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+    def events(self, job):
+        # Server-sent events: one event per state change, ending with the
+        # done/failed event. Each open stream holds a request thread, so
+        # streams close after JOB_EVENTS_TIMEOUT and EventSource reconnects.
+        # Streams are only served by threaded workers and under the stream
+        # cap; clients turned away poll GET /jobs/<job_id> instead.
+        self.ensure_workers()
+        deadline = time.monotonic() + JOB_EVENTS_TIMEOUT
+        last_state, last_sent = None, time.monotonic()
+        yield f"retry: {int(JOB_POLL_INTERVAL * 1000)}\n\n"
+        while True:
+            state = (job["status"], job.get("position"))
+            if state != last_state:
+                yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                last_state, last_sent = state, time.monotonic()
+            elif time.monotonic() - last_sent > KEEPALIVE_INTERVAL:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            if job["status"] in FINISHED or time.monotonic() > deadline:
+                return
+            with self._changed:
+                self._changed.wait(JOB_POLL_INTERVAL)
+            job = self.get(job["job_id"]) or dict(job, status='failed', error='job expired')
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _claim(self):
+        now = time.time()
+        with get_connection() as conn, transaction(conn):
+            return conn.execute(CLAIM_JOB_SQL, (now, now + JOB_LEASE_TIMEOUT)).fetchone()
+
+    def _work_loop(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"⚠️ Job claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                self._maintain()
+                continue
+            self._notify()
+            self._run(*job)
+
+    def _run(self, job_id, user_id, payload, created_at):
+        started = time.time()
+        metrics.observe('evolve_job_duration_seconds', started - created_at, stage='queued')
+        try:
+            result, error = json.dumps(self.handler(json.loads(payload), user_id), ensure_ascii=False), None
+            status = 'done'
+        except Exception as e:
+            print(f"⚠️ Job {job_id} failed: {e}")
+            result, error, status = None, str(e), 'failed'
+        finished = time.time()
+        metrics.observe('evolve_job_duration_seconds', finished - started, stage='run')
+        metrics.inc('evolve_jobs_total', outcome=status)
+        try:
+            with get_connection() as conn, transaction(conn):
+                conn.execute(FINISH_JOB_SQL, (status, result, error, finished, job_id))
+        except Exception as e:
+            # The lease expires and another worker runs the job again
+            print(f"⚠️ Job {job_id} result not stored: {e}")
+        self._notify()
+
+    def _maintain(self):
+        # Requeue jobs orphaned by dead workers and drop old finished ones
+        now = time.time()
+        with self._lock:
+            if now - self._last_maintenance < MAINTENANCE_INTERVAL:
+                return
+            self._last_maintenance = now
+        try:
+            with get_connection() as conn, transaction(conn):
+                requeued = conn.execute(REQUEUE_EXPIRED_SQL, {"max_attempts": JOB_MAX_ATTEMPTS, "now": now}).rowcount
+                conn.execute(PURGE_JOBS_SQL, (now - JOB_RETENTION,))
+        except Exception as e:
+            print(f"⚠️ Job maintenance failed: {e}")
+            return
+        if requeued:
+            print(f"♻️ Recovered {requeued} interrupted job(s)")
+            self._wakeup.set()
@@ -0,0 +1,179 @@
+# Async LLM strategy generation
+# Each worker runs one asyncio loop in a background thread. Sync request
+# handlers submit coroutines to it and wait at most the latency budget, so a
+# slow model never holds a gunicorn worker longer than that; on timeout or
+# error the caller falls back to the template strategy. Calls wait for a
+# semaphore slot in a bounded queue, and a queued call whose callers have all
+# given up is dropped before it reaches the model.
+import os
+import asyncio
+import threading
+import concurrent.futures
+
+from metrics import metrics
+
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+LLM_MODE = os.getenv('LLM_MODE', 'auto')
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', 8))
+LLM_MAX_QUEUED = int(os.getenv('LLM_MAX_QUEUED', 2 * LLM_CONCURRENCY))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 20))
+LLM_LATENCY_BUDGET = float(os.getenv('LLM_LATENCY_BUDGET', 8))
+LLM_MAX_TOKENS = int(os.getenv('LLM_MAX_TOKENS', 1800))
+
+SYSTEM_PROMPT = (
+    "You are E-Volve.ai, the LVX Labs content strategy engine. You write viral "
+    "short-form video strategies for creators and weave in Metafyzical Smart "
+    "Energy naturally. Keep every section heading and emoji of the draft you "
+    "are given, make each section specific to the creator's request, and "
+    "return plain text only."
+)
+
+def build_prompt(result):
+    return (
+        f"Content request: {result['intent']}\n"
+        f"Category: {result['category']}\n"
+        f"Game/Industry: {result['game_industry'] or 'not specified'}\n"
+        f"Target audience: {result['audience']}\n\n"
+        "Improve this draft strategy for the request above:\n\n"
+        f"{result['text']}"
+    )
+
+class LLMQueueFull(Exception):
+    pass
+
+class LLMGenerator:
+    def __init__(self, api_key, base_url=OPENAI_BASE_URL, model=OPENAI_MODEL, concurrency=LLM_CONCURRENCY,
+                 timeout=LLM_TIMEOUT, latency_budget=LLM_LATENCY_BUDGET, max_queued=LLM_MAX_QUEUED):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.latency_budget = latency_budget
+        self.stats = {"calls": 0, "coalesced": 0, "timeouts": 0, "errors": 0, "shed": 0, "skipped": 0, "fallbacks": 0}
+        self._queued = 0
+        self._pid = None
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        metrics.register_source(self.metric_values)
+
+    def metric_values(self):
+        return {('evolve_llm_calls_total', (('outcome', outcome),)): count for outcome, count in self.stats.items()}
+
+    def _ensure_loop(self):
+        # One loop per process - a loop inherited across fork has no thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            from openai import AsyncOpenAI
+
+            loop = asyncio.new_event_loop()
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0
+            )
+            self._semaphore = asyncio.BoundedSemaphore(self.concurrency)
+            self._inflight = {}
+            self._queued = 0
+            threading.Thread(target=loop.run_forever, name='evolve-llm-loop', daemon=True).start()
+            self._loop = loop
+            self._pid = os.getpid()
+
+    async def _complete(self, entry, prompt):
+        # Counted in _queued from creation until it holds a semaphore slot
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        try:
+            if not entry["waiters"]:
+                # Every caller ran out of budget while this call was queued
+                self.stats["skipped"] += 1
+                return None
+            self.stats["calls"] += 1
+            response = await asyncio.wait_for(
+                self._client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=LLM_MAX_TOKENS,
+                    temperature=0.8
+                ),
+                self.timeout
+            )
+        finally:
+            self._semaphore.release()
+        return response.choices[0].message.content
+
+    async def agenerate(self, key, prompt, on_late_result=None):
+        # Identical in-flight requests share one model call
+        entry = self._inflight.get(key)
+        if entry is None:
+            if self._queued >= self.max_queued:
+                raise LLMQueueFull(f"{self._queued} model calls already waiting")
+            entry = self._inflight[key] = {"waiters": 0}
+            self._queued += 1
+            entry["task"] = asyncio.ensure_future(self._complete(entry, prompt))
+            entry["task"].add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        except asyncio.CancelledError:
+            # Caller gave up; a call already under way can still deliver late
+            if on_late_result is not None:
+                entry["task"].add_done_callback(lambda done: self._deliver_late(done, on_late_result))
+            raise
+        finally:
+            entry["waiters"] -= 1
+
+    def submit(self, key, prompt, on_late_result=None):
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.agenerate(key, prompt, on_late_result), self._loop)
+
+    def generate(self, key, prompt, budget=None, on_late_result=None):
+        # Returns the model text, or None if the caller should fall back.
+        # on_late_result receives the text if the call was already running
+        # when the budget ran out and finishes afterwards.
+        future = self.submit(key, prompt, on_late_result)
+        try:
+            text = future.result(timeout=self.latency_budget if budget is None else budget)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.stats["timeouts"] += 1
+            self.stats["fallbacks"] += 1
+            print("⚠️ LLM over latency budget - using advanced templates")
+            return None
+        except LLMQueueFull:
+            self.stats["shed"] += 1
+            self.stats["fallbacks"] += 1
+            print("⚠️ LLM queue full - using advanced templates")
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["fallbacks"] += 1
+            print(f"⚠️ LLM generation failed: {e} - using advanced templates")
+            return None
+        if not text or not text.strip():
+            self.stats["fallbacks"] += 1
+            return None
+        return text.strip()
+
+    def _deliver_late(self, future, callback):
+        if future.cancelled() or future.exception() is not None:
+            return
+        text = future.result()
+        if text and text.strip():
+            callback(text.strip())
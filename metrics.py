@@ -0,0 +1,220 @@
+# Performance instrumentation
+# Each worker records counters and latency histograms in memory and flushes
+# the deltas into a shared SQLite table, so /metrics reports totals across
+# every gunicorn worker in Prometheus text format. A sampling profiler can be
+# switched on per request with the X-Evolve-Profile header.
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.001))
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    "evolve_http_request_duration_seconds": ("histogram", "Request latency by route"),
+    "evolve_stage_duration_seconds": ("histogram", "Time spent in each generation stage"),
+    "evolve_db_write_duration_seconds": ("histogram", "Batched SQLite write latency"),
+    "evolve_db_rows_written_total": ("counter", "Rows committed by background writers"),
+    "evolve_cache_requests_total": ("counter", "Strategy cache lookups by tier and result"),
+    "evolve_cache_evictions_total": ("counter", "Strategy cache LRU evictions"),
+    "evolve_llm_calls_total": ("counter", "LLM generation calls by outcome"),
+    "evolve_jobs_total": ("counter", "Async generation jobs by outcome"),
+    "evolve_job_duration_seconds": ("histogram", "Async job time spent queued and running"),
+    "evolve_requests_shed_total": ("counter", "Requests rejected by admission control"),
+}
+
+UPSERT_METRIC_SQL = '''INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?)
+    ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value'''
+SELECT_METRICS_SQL = 'SELECT name, labels, value FROM metrics ORDER BY name, labels'
+
+def format_labels(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+def format_value(value):
+    # Full precision: counters and sums run well past the 6 digits of :g
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def bucket_order(point):
+    # le is always the last label; order buckets numerically per series
+    series_labels, _, bound = point[0].rpartition('le="')
+    return series_labels, float(bound.rstrip('"').replace('+Inf', 'inf'))
+
+class MetricsRegistry:
+    def __init__(self):
+        self._counters = Counter()
+        self._histograms = {}
+        self._sources = []
+        self._exported = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def inc(self, name, value=1, **labels):
+        self._ensure_flusher()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name, seconds, **labels):
+        self._ensure_flusher()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(BUCKETS)] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_source(self, source):
+        # source() returns cumulative per-worker counter values as
+        # {(name, labels tuple): value}; only the growth is exported
+        self._sources.append(source)
+
+    def _collect(self):
+        rows = []
+        with self._lock:
+            counters, self._counters = self._counters, Counter()
+            histograms, self._histograms = self._histograms, {}
+        for source in self._sources:
+            for key, value in source().items():
+                delta = value - self._exported.get(key, 0)
+                if delta:
+                    counters[key] += delta
+                    self._exported[key] = value
+        for (name, labels), value in counters.items():
+            rows.append((name, format_labels(labels), value))
+        for (name, labels), histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram):
+                cumulative += count
+                rows.append((f"{name}_bucket", format_labels(labels + (('le', bound),)), cumulative))
+            rows.append((f"{name}_sum", format_labels(labels), histogram[-1]))
+            rows.append((f"{name}_count", format_labels(labels), cumulative))
+        return rows
+
+    def flush(self):
+        from persistence import get_connection, transaction
+
+        rows = self._collect()
+        if not rows:
+            return
+        try:
+            with get_connection() as conn, transaction(conn):
+                conn.executemany(UPSERT_METRIC_SQL, rows)
+        except Exception as e:
+            print(f"⚠️ Metrics flush failed: {e}")
+
+    def _ensure_flusher(self):
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            from persistence import reserve_connections
+            reserve_connections()
+            threading.Thread(target=self._flush_loop, name='evolve-metrics-flush', daemon=True).start()
+
+    def _after_fork(self):
+        # Anything recorded before a fork belongs to the parent. Baselining
+        # here rather than on first use keeps growth the child makes before
+        # its first inc/observe (e.g. a cache miss inside a timer)
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._histograms = {}
+        self._exported = {key: value for source in self._sources for key, value in source().items()}
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def render(self):
+        from persistence import get_connection
+
+        self.flush()
+        with get_connection() as conn:
+            rows = conn.execute(SELECT_METRICS_SQL).fetchall()
+        series = {}
+        for name, labels, value in rows:
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for metric, (metric_type, help_text) in METRICS.items():
+            names = [f"{metric}_bucket", f"{metric}_sum", f"{metric}_count"] if metric_type == "histogram" else [metric]
+            if not any(name in series for name in names):
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name in names:
+                points = series.get(name, [])
+                if name.endswith('_bucket'):
+                    points = sorted(points, key=bucket_order)
+                for labels, value in points:
+                    value = format_value(value)
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+atexit.register(metrics.flush)
+
+class SamplingProfiler:
+    # Samples one thread's stack every PROFILE_INTERVAL seconds and writes
+    # collapsed stacks (flamegraph.pl / speedscope format)
+    def __init__(self, thread_id, label):
+        self.thread_id = thread_id
+        self.filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{thread_id}-{label}.folded"
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='evolve-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(PROFILE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, self.filename), 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔬 Profile written: {self.filename} ({self.samples} samples)")
+        return self.filename
@@ -0,0 +1,403 @@
+# SQLite persistence layer
+# Each gunicorn worker keeps its own small pool of WAL-mode connections, and
+# strategy rows are written by a background thread that commits in batches so
+# inserts never sit on the request path.
+import os
+import json
+import queue
+import sqlite3
+import threading
+import time
+import atexit
+from contextlib import contextmanager
+
+from metrics import metrics
+
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'evolve_ai_intelligence.db')
+# Connections for request threads; background threads reserve their own
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))
+BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 10))
+WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', 200))
+WRITE_FLUSH_INTERVAL = float(os.getenv('DB_WRITE_FLUSH_INTERVAL', 0.25))
+WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', 20000))
+
+# SQL is kept in constants so sqlite3's per-connection statement cache
+# reuses the prepared statement on every call
+INSERT_STRATEGY_SQL = '''INSERT OR IGNORE INTO strategy_performance
+    (strategy_id, user_id, intent, category, viral_score, metadata)
+    VALUES (?, ?, ?, ?, ?, ?)'''
+
+SELECT_STRATEGY_RESULT_SQL = '''SELECT user_id, category, metadata,
+    engagement_rate, conversion_rate, success_rating, performance_updated_at
+    FROM strategy_performance WHERE strategy_id = ?'''
+
+# Every reported result is logged for the viral model; a re-report also logs
+# the old result with sign -1 so it is taken back out
+INSERT_TRAINING_EVENT_SQL = '''INSERT INTO viral_training_log
+    (strategy_id, sign, engagement_rate, conversion_rate, success_rating)
+    VALUES (?, ?, ?, ?, ?)'''
+
+UPDATE_PERFORMANCE_SQL = '''UPDATE strategy_performance
+    SET engagement_rate = ?, conversion_rate = ?, success_rating = ?, performance_updated_at = ?
+    WHERE strategy_id = ?'''
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS user_profiles (
+        user_id TEXT PRIMARY KEY,
+        content_style TEXT,
+        audience_preferences TEXT,
+        success_patterns TEXT,
+        performance_data TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS strategy_performance (
+        strategy_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        intent TEXT,
+        category TEXT,
+        viral_score INTEGER,
+        engagement_rate REAL,
+        conversion_rate REAL,
+        success_rating INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS metrics (
+        name TEXT,
+        labels TEXT,
+        value REAL,
+        PRIMARY KEY (name, labels)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS strategy_cache (
+        cache_key TEXT PRIMARY KEY,
+        value TEXT,
+        expires_at REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        status TEXT,
+        payload TEXT,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER,
+        created_at REAL,
+        started_at REAL,
+        finished_at REAL,
+        lease_expires_at REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS viral_training_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        strategy_id TEXT,
+        sign INTEGER,
+        engagement_rate REAL,
+        conversion_rate REAL,
+        success_rating INTEGER
+    )''',
+    '''CREATE TABLE IF NOT EXISTS viral_model_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        config TEXT,
+        watermark INTEGER,
+        observations INTEGER,
+        a BLOB,
+        b BLOB
+    )''',
+)
+
+# Bump whenever SCHEMA, COLUMN_MIGRATIONS or INDEXES change
+SCHEMA_VERSION = 2
+
+# Columns added after the original schema: (table, column, type)
+COLUMN_MIGRATIONS = (
+    ('strategy_performance', 'metadata', 'TEXT'),
+    ('strategy_performance', 'performance_updated_at', 'REAL'),
+)
+
+# One-off data changes: (schema version that introduced it, statement)
+DATA_MIGRATIONS = (
+    (2, '''INSERT INTO viral_training_log (strategy_id, sign, engagement_rate, conversion_rate, success_rating)
+        SELECT strategy_id, 1, engagement_rate, conversion_rate, success_rating FROM strategy_performance
+        WHERE performance_updated_at IS NOT NULL ORDER BY performance_updated_at'''),
+)
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_strategy_performance_updated ON strategy_performance (performance_updated_at)',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)',
+)
+
+def connect(path=None):
+    conn = sqlite3.connect(
+        path or DATABASE_PATH,
+        timeout=BUSY_TIMEOUT,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=128
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}')
+    return conn
+
+@contextmanager
+def transaction(conn):
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers
+    # wait on busy_timeout instead of failing with "database is locked"
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+class ConnectionPool:
+    def __init__(self, path=None, size=POOL_SIZE):
+        self.path = path or DATABASE_PATH
+        self.size = size
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return connect(self.path)
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=BUSY_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"no SQLite connection free after {BUSY_TIMEOUT}s - "
+                               f"all {self.size} are in use (DB_POOL_SIZE={POOL_SIZE})") from None
+
+    def reserve(self, count=1):
+        # Each background thread that holds a connection through a busy wait
+        # adds one, so it never starves request threads
+        with self._lock:
+            self.size += count
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Pools are per process - a pool inherited across fork is discarded
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool()
+    return _pool
+
+def get_connection():
+    return get_pool().connection()
+
+def reserve_connections(count=1):
+    get_pool().reserve(count)
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def init_database(path=None):
+    # Migrates the schema once per deployment: workers only read user_version,
+    # and BEGIN IMMEDIATE makes concurrent starters wait for the first one.
+    # Returns True if this call applied the migration.
+    conn = connect(path)
+    try:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return False
+        with transaction(conn):
+            current = schema_version(conn)
+            if current >= SCHEMA_VERSION:
+                return False
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for table, column, column_type in COLUMN_MIGRATIONS:
+                columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+            for statement in INDEXES:
+                conn.execute(statement)
+            for version, statement in DATA_MIGRATIONS:
+                if current < version:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        return True
+    finally:
+        conn.close()
+
+class BatchWriter:
+    def __init__(self, name, sql, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.name = name
+        self.sql = sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = None
+        self._pending = set()
+        self._written = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush, 5)
+        metrics.register_source(self.metric_values)
+
+    def _ensure_started(self):
+        # Started lazily so each forked worker gets its own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            self._pending = set()
+            self._written = threading.Condition()
+            reserve_connections()
+            self._thread = threading.Thread(target=self._run, name='evolve-db-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, row, key=None):
+        # key lets wait_for() find out when this particular row is committed
+        self._ensure_started()
+        if key is not None:
+            with self._written:
+                self._pending.add(key)
+        try:
+            self._queue.put_nowait((row, key))
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ DB write queue full - dropped row ({self.dropped} total)")
+            if key is not None:
+                with self._written:
+                    self._pending.discard(key)
+
+    def wait_for(self, key, timeout):
+        # True if the row was still queued here and has been written since
+        if self._pid != os.getpid():
+            return False
+        with self._written:
+            if key not in self._pending:
+                return False
+            return self._written.wait_for(lambda: key not in self._pending, timeout)
+
+    def flush(self, timeout=None):
+        # Block until everything submitted so far has been committed
+        if self._pid != os.getpid():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.005)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        for attempt in range(3):
+            try:
+                with metrics.timer('evolve_db_write_duration_seconds', writer=self.name):
+                    with get_connection() as conn, transaction(conn):
+                        conn.executemany(self.sql, batch)
+                self.written += len(batch)
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == 2:
+                    self.failed += len(batch)
+                    print(f"⚠️ DB batch write failed ({len(batch)} rows): {e}")
+                else:
+                    time.sleep(0.05 * (attempt + 1))
+
+    def metric_values(self):
+        return {
+            ('evolve_db_rows_written_total', (('result', 'written'), ('writer', self.name))): self.written,
+            ('evolve_db_rows_written_total', (('result', 'dropped'), ('writer', self.name))): self.dropped,
+            ('evolve_db_rows_written_total', (('result', 'failed'), ('writer', self.name))): self.failed
+        }
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write([row for row, _ in batch])
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"⚠️ DB writer error: {e}")
+            finally:
+                with self._written:
+                    for _, key in batch:
+                        self._pending.discard(key)
+                    self._written.notify_all()
+                for _ in batch:
+                    self._queue.task_done()
+
+strategy_writer = BatchWriter('strategies', INSERT_STRATEGY_SQL)
+
+def record_strategy(strategy_id, user_id, intent, category, viral_score, metadata):
+    strategy_writer.submit((
+        strategy_id,
+        user_id,
+        intent,
+        category,
+        viral_score,
+        json.dumps(metadata, ensure_ascii=False)
+    ), key=strategy_id)
+
+def record_performance(strategy_id, engagement_rate, conversion_rate, success_rating, fold=None):
+    # Returns False if the strategy does not exist (yet). fold(conn, strategy,
+    # previous, current) runs in the same transaction to update aggregates.
+    current = (engagement_rate, conversion_rate, success_rating)
+    for attempt in range(2):
+        with get_connection() as conn, transaction(conn):
+            row = conn.execute(SELECT_STRATEGY_RESULT_SQL, (strategy_id,)).fetchone()
+            if row is not None:
+                previous = tuple(row[3:6]) if row[6] is not None else None
+                conn.execute(UPDATE_PERFORMANCE_SQL, current + (time.time(), strategy_id))
+                if previous is not None:
+                    conn.execute(INSERT_TRAINING_EVENT_SQL, (strategy_id, -1) + previous)
+                conn.execute(INSERT_TRAINING_EVENT_SQL, (strategy_id, 1) + current)
+                if fold is not None:
+                    fold(conn, tuple(row[:3]), previous, current)
+                return True
+        # Only a strategy still queued in this worker's writer is worth waiting for
+        if attempt or not strategy_writer.wait_for(strategy_id, 1):
+            return False
@@ -0,0 +1,152 @@
+# Admission control
+# Per-client token buckets plus global caps on in-flight generation and on
+# open event streams, shared by every gunicorn worker through a small memory-mapped file. A check is one
+# flock round trip and a few struct reads/writes, so it costs microseconds
+# where a SQLite write transaction per request would cost a commit.
+import os
+import math
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from persistence import DATABASE_PATH
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', f"{DATABASE_PATH}-ratelimit")
+RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', 30))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', 10))
+RATE_LIMIT_CONCURRENCY = int(os.getenv('RATE_LIMIT_CONCURRENCY', 16))
+# Open job event streams, across all workers; keep it well under the total
+# request thread count (workers x --threads)
+RATE_LIMIT_STREAMS = int(os.getenv('RATE_LIMIT_STREAMS', 2))
+# Batch items are charged to a separate, larger budget
+RATE_LIMIT_BATCH_ITEMS_PER_MINUTE = float(os.getenv('RATE_LIMIT_BATCH_ITEMS_PER_MINUTE', 1000))
+RATE_LIMIT_BATCH_BURST = float(os.getenv('RATE_LIMIT_BATCH_BURST', 5000))
+RATE_LIMIT_SLOT_TIMEOUT = float(os.getenv('RATE_LIMIT_SLOT_TIMEOUT', 300))
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 0))
+BUCKET_SLOTS = int(os.getenv('RATE_LIMIT_BUCKETS', 65536))
+PROBES = 8
+
+# File layout: header, then concurrency slots, then the bucket hash table
+HEADER = struct.Struct('<8sQQQ')           # magic, bucket slots, concurrency slots, stream slots
+SLOT = struct.Struct('<qd')                 # pid, acquired at
+BUCKET = struct.Struct('<Qdd')              # key hash, tokens, updated at
+MAGIC = b'EVRATE02'
+
+class RateLimiter:
+    def __init__(self, path=RATE_LIMIT_PATH, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST,
+                 concurrency=RATE_LIMIT_CONCURRENCY, streams=RATE_LIMIT_STREAMS, buckets=BUCKET_SLOTS,
+                 enabled=RATE_LIMIT_ENABLED):
+        self.path = path
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.concurrency = concurrency
+        self.streams = streams
+        self.buckets = buckets
+        self.enabled = enabled
+        # Slot pools: generation slots first, then event stream slots
+        self.pools = {'generate': range(concurrency), 'events': range(concurrency, concurrency + streams)}
+        self.bucket_offset = HEADER.size + (concurrency + streams) * SLOT.size
+        self.size = self.bucket_offset + buckets * BUCKET.size
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _ensure_open(self):
+        # flock is held per open file, so each process opens its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, HEADER.size, 0)
+                if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, self.buckets, self.concurrency, self.streams):
+                    # New file or a different configuration: start from empty state
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, HEADER.pack(MAGIC, self.buckets, self.concurrency, self.streams), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, self.size)
+            self._fd = fd
+            self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        self._ensure_open()
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def take(self, key, cost=1):
+        # Returns 0 if the client may proceed, else seconds until it may retry
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+        start = key_hash % self.buckets
+        now = time.time()
+        with self._locked() as buf:
+            victim, victim_updated = None, math.inf
+            for probe in range(PROBES):
+                offset = self.bucket_offset + (start + probe) % self.buckets * BUCKET.size
+                slot_hash, tokens, updated = BUCKET.unpack_from(buf, offset)
+                if slot_hash == key_hash:
+                    tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                    break
+                if updated < victim_updated:
+                    # Empty slots have updated=0, so they are reused first
+                    victim, victim_updated = offset, updated
+            else:
+                # Unknown client: take the stalest slot in its probe window
+                offset, tokens = victim, self.burst
+
+            if tokens >= cost:
+                BUCKET.pack_into(buf, offset, key_hash, tokens - cost, now)
+                return 0
+            BUCKET.pack_into(buf, offset, key_hash, tokens, now)
+        return math.ceil((cost - tokens) / self.rate) if self.rate else 60
+
+    def acquire_slot(self, pool='generate'):
+        # Returns a token for release_slot, or None when the pool's global cap is reached
+        pid, now = os.getpid(), time.time()
+        with self._locked() as buf:
+            held = []
+            for slot in self.pools[pool]:
+                offset = HEADER.size + slot * SLOT.size
+                owner, acquired = SLOT.unpack_from(buf, offset)
+                if not owner or now - acquired > RATE_LIMIT_SLOT_TIMEOUT:
+                    SLOT.pack_into(buf, offset, pid, now)
+                    return slot, now
+                held.append((slot, owner))
+            # Full: reclaim slots left behind by workers that died mid-request
+            for slot, owner in held:
+                if owner != pid and not pid_alive(owner):
+                    SLOT.pack_into(buf, HEADER.size + slot * SLOT.size, pid, now)
+                    return slot, now
+        return None
+
+    def release_slot(self, token):
+        slot, acquired = token
+        with self._locked() as buf:
+            offset = HEADER.size + slot * SLOT.size
+            # Skip slots reclaimed by someone else after a timeout
+            if SLOT.unpack_from(buf, offset) == (os.getpid(), acquired):
+                SLOT.pack_into(buf, offset, 0, 0.0)
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
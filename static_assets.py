@@ -0,0 +1,65 @@
+# Precompressed static assets
+# Bodies are compressed once at startup (gzip, plus brotli when installed) and
+# carry strong ETags, so serving the landing page is a header check and a
+# buffer write instead of rebuilding and re-encoding it per request.
+import os
+import gzip
+import hashlib
+import mimetypes
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/manifest+json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 512
+PAGE_CACHE_CONTROL = os.getenv('PAGE_CACHE_CONTROL', 'public, max-age=300')
+STATIC_CACHE_CONTROL = os.getenv('STATIC_CACHE_CONTROL', 'public, max-age=604800')
+
+class StaticAsset:
+    def __init__(self, body, mimetype, cache_control=PAGE_CACHE_CONTROL):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # (encoding, body, etag) in order of preference; identity last
+        self.variants = []
+        if mimetype.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.variants.append(('br', brotli.compress(body, quality=11), f"{digest}-br"))
+            self.variants.append(('gzip', gzip.compress(body, 9, mtime=0), f"{digest}-gz"))
+        self.variants.append((None, body, digest))
+
+    def _choose(self):
+        for encoding, body, etag in self.variants:
+            if encoding is None or request.accept_encodings[encoding]:
+                return encoding, body, etag
+
+    def response(self):
+        encoding, body, etag = self._choose()
+        headers = {
+            'ETag': f'"{etag}"',
+            'Cache-Control': self.cache_control
+        }
+        if len(self.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype=self.mimetype, headers=headers)
+
+def load_static_dir(path, cache_control=STATIC_CACHE_CONTROL):
+    assets = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            full_path = os.path.join(root, name)
+            filename = os.path.relpath(full_path, path).replace(os.sep, '/')
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            with open(full_path, 'rb') as f:
+                assets[filename] = StaticAsset(f.read(), mimetype, cache_control)
+    return assets
@@ -0,0 +1,146 @@
+# Content-addressed strategy cache
+# Keys are a SHA-256 of the trimmed inputs. An in-process LRU tier with a
+# TTL sits in front of an optional SQLite tier that every gunicorn worker
+# shares, so a prompt pasted by a whole Discord campaign is generated once.
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from persistence import BatchWriter, get_connection, transaction
+from metrics import metrics
+
+CACHE_SIZE = int(os.getenv('STRATEGY_CACHE_SIZE', 2048))
+CACHE_TTL = float(os.getenv('STRATEGY_CACHE_TTL', 3600))
+SHARED_CACHE = os.getenv('STRATEGY_CACHE_SHARED', '1') == '1'
+PURGE_EVERY = 1000
+
+SELECT_CACHE_SQL = 'SELECT value, expires_at FROM strategy_cache WHERE cache_key = ?'
+UPSERT_CACHE_SQL = 'INSERT OR REPLACE INTO strategy_cache (cache_key, value, expires_at) VALUES (?, ?, ?)'
+PURGE_CACHE_SQL = 'DELETE FROM strategy_cache WHERE expires_at < ?'
+
+def normalize(value):
+    # Only surrounding whitespace: a hit serves the stored intent, hooks and
+    # text, so inputs that differ in case or spacing must not share an entry
+    return str(value or '').strip()
+
+def strategy_key(intent, category, game_industry, audience, source='template'):
+    # v2: v1 keys were case- and space-insensitive
+    raw = "\x1f".join(normalize(value) for value in ('v2', intent, category, game_industry, audience, source))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class LRUCache:
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        with self._lock:
+            self._entries[key] = (value, expires_at or time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+class StrategyCache:
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, shared=SHARED_CACHE):
+        self.ttl = ttl
+        self.shared = shared
+        self.local = LRUCache(size, ttl)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+        self._writes = 0
+        self._writer = BatchWriter('strategy_cache', UPSERT_CACHE_SQL)
+        metrics.register_source(self.metric_values)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+        if self.shared:
+            value = self._get_shared(key)
+            if value is not None:
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def _get_shared(self, key):
+        try:
+            with get_connection() as conn:
+                row = conn.execute(SELECT_CACHE_SQL, (key,)).fetchone()
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"⚠️ Shared cache read failed: {e}")
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        value = json.loads(row[0])
+        self.local.set(key, value, row[1])
+        return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        self.local.set(key, value, expires_at)
+        if self.shared:
+            self._writer.submit((key, json.dumps(value, ensure_ascii=False), expires_at))
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.purge_expired()
+
+    def purge_expired(self):
+        try:
+            with get_connection() as conn, transaction(conn):
+                conn.execute(PURGE_CACHE_SQL, (time.time(),))
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"⚠️ Shared cache purge failed: {e}")
+
+    def metric_values(self):
+        return {
+            ('evolve_cache_requests_total', (('result', 'hit'), ('tier', 'local'))): self.local_hits,
+            ('evolve_cache_requests_total', (('result', 'hit'), ('tier', 'shared'))): self.shared_hits,
+            ('evolve_cache_requests_total', (('result', 'miss'), ('tier', 'all'))): self.misses,
+            ('evolve_cache_evictions_total', ()): self.local.evictions
+        }
+
+    def stats(self):
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "shared_errors": self.shared_errors,
+            "size": len(self.local),
+            "capacity": self.local.size
+        }
@@ -0,0 +1,174 @@
+# Precompiled strategy templates
+# Layouts are parsed once at import into static segments and named
+# substitution slots, so rendering is a list copy plus a single join.
+# The strategy and result page are also split into sections so /generate can
+# stream the page as it is produced.
+import re
+from string import Formatter
+
+
+class CompiledTemplate:
+    def __init__(self, source):
+        self.text_parts = []
+        self.slots = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                self.text_parts.append(literal)
+            if field is not None:
+                if spec or conversion:
+                    raise ValueError(f"template slot {{{field}}} must be a plain name")
+                self.slots.append((len(self.text_parts), field))
+                self.text_parts.append('')
+        # Static sections are stored pre-encoded for byte-level responses
+        self.byte_parts = [part.encode('utf-8') for part in self.text_parts]
+        self.slot_names = frozenset(name for _, name in self.slots)
+
+    def render(self, values):
+        parts = self.text_parts.copy()
+        for position, name in self.slots:
+            parts[position] = str(values[name])
+        return ''.join(parts)
+
+    def render_bytes(self, values):
+        parts = self.byte_parts.copy()
+        for position, name in self.slots:
+            parts[position] = str(values[name]).encode('utf-8')
+        return b''.join(parts)
+
+
+STRATEGY_LAYOUT = """🧠 ULTIMATE E-VOLVE.AI INTELLIGENCE STRATEGY #{session_id}
+TARGET: {intent}
+
+📊
+VIRAL PREDICTION ANALYSIS:
+🎯 Viral Score: {viral_score}/100 (HIGH CONFIDENCE)
+📈 Score Breakdown:
+  • Hook Strength: {hook_strength}/100
+  • Trend Alignment: {trend_alignment}/100
+  • Audience Match: {audience_match}/100
+  • Content Quality: {content_quality}/100
+
+🧠 ADVANCED PSYCHOLOGICAL HOOKS:
+• Hook A: "{hook_a}"
+• Hook B: "{hook_b}"
+• Hook C: "{hook_c}"
+
+📝 EXPERT-LEVEL 60-SECOND SCRIPT:
+0-3s: "{hook_a}"
+(Direct eye contact, confident delivery, immediate pattern interrupt)
+
+3-15s: "Here's what most {audience} miss about {category}: [specific misconception about {intent}]. After analyzing thousands of successful creators and working with our Discord community of 5,000+, I've identified the exact mistake that kills results every time."
+
+15-35s: "My proven 3-step intelligence system for {intent}:
+Step 1 - Advanced competitor gap analysis and trend prediction timing
+Step 2 - Multi-platform optimization with viral factor maximization  
+Step 3 - Metafyzical integration for sustained focus and community building
+This isn't theory - it's intelligence-driven strategy that actually works."
+
+35-50s: "When I applied this exact system to {subject}, our community saw 300% engagement increase in just 60 days. The proof is in our $2,000 Apex tournaments and 5,000+ Discord members."
+
+50-60s: "Follow @lvxlabs for intelligence-driven strategies + {energy_context} with Metafyzical Smart Energy - clean, sustained focus without crashes. Link in bio for 20% off with code EVOLVE20!"
+
+📱 MULTI-PLATFORM OPTIMIZATION:
+🎵 TikTok Strategy:
+  • Optimal Length: 45-60 seconds
+  • Hook Timing: 0-3 seconds critical
+  • Engagement: Use trending sounds, encourage duets
+
+📸 Instagram Reels Strategy:
+  • Format: Educational tutorial format
+  • Hashtag Count: 15-20 strategic mix
+  • Key Factors: Watch time, saves optimization
+
+🎬 YouTube Shorts Strategy:
+  • Optimization: How-to tutorial format
+  • Length Target: 30-60 seconds
+  • Focus: Click-through rate, subscriber conversion
+
+#️⃣ STRATEGIC HASHTAG INTELLIGENCE:
+{hashtag_string}
+
+⚡ ADVANCED METAFYZICAL INTEGRATION:
+Integration Style: Natural Personal Story
+Natural Mention: "Creating {intent} content requires sustained mental focus. That's why I fuel up with Metafyzical Smart Energy - {energy_context}. Clean ingredients, no crashes, perfect for {category} content creation."
+Conversion Prediction: 18.5% (High Confidence)
+Optimization: Mention specific use case, include personal experience, emphasize clean ingredients
+
+🔥 ULTIMATE ENGAGEMENT STRATEGY:
+• Primary Tactic: Ask "{audience}, what's your biggest {category} challenge? Drop it below 👇"
+• Response Strategy: Reply within 15 minutes using voice messages for top 10 comments
+• Community Funnel: "Join our Discord for exclusive {category} strategies and connect with 5,000+ creators"
+• Follow-up Content: Create Part 2 based on most requested comment topic
+• Cross-platform: Share to Instagram Reels 90 minutes later, YouTube Shorts 3 hours later
+
+🎯 TREND PREDICTION & TIMING:
+Current Trending: AI content creation, Clean energy supplements, Gaming optimization
+Seasonal Factor: Mid-year goals, Summer tournaments
+Optimal Posting: 7:30 PM EST (peak {audience} engagement)
+Trend Alignment Score: {trend_alignment}/100
+
+📈 SUCCESS METRICS & KPIs:
+Primary Metrics: Completion rate (target 87%+), saves (target 15%+), Discord joins
+Viral Indicators: Share rate (target 8%+), comment engagement (target 12%+)
+Conversion Tracking: EVOLVE20 code usage, Metafyzical sales attribution
+Community Growth: Discord member acquisition, VIP club conversions
+
+💪 LVX LABS ECOSYSTEM INTEGRATION:
+Tournament Connection: "Use these strategies in our $2,000 Apex Legends tournament"
+Discord Community: "Join 5,000+ creators for exclusive {category} strategies and live events"
+VIP Club Benefits: "VIP members get early access to intelligence like this + direct CEO access"
+Flex Fight Series: "Apply these techniques to our monthly Flex Fight Series content"
+
+🚀 VIRAL OPTIMIZATION CHECKLIST:
+✓ Hook strength optimized for {hook_strength}/100 score
+✓ Trend alignment maximized at {trend_alignment}/100
+✓ Multi-platform strategy deployed across 3 platforms
+✓ Psychological triggers calibrated for {audience}
+✓ Metafyzical integration optimized for 18.5% conversion
+✓ Community funnel activated for Discord growth
+✓ Performance tracking enabled for continuous learning
+
+🧠 AI LEARNING INSIGHTS:
+User Profile: {profile_insight}
+Audience Match: {audience_insight}
+Success Pattern: {success_pattern}
+Intelligence Level: Ultimate - All systems activated
+
+⚡ POWERED BY ULTIMATE E-VOLVE.AI INTELLIGENCE
+Session #{session_id} | Multi-System AI Analysis | LVX Labs Innovation
+Generated: {generated_at}
+
+"The most advanced content strategy AI ever created - delivering human-level intelligence with machine-scale analysis."
+
+🎮 Ready to dominate? Join our Discord, fuel up with Metafyzical, and let's build the future of content creation together! 🚀"""
+
+RESULT_PAGE_HEAD_LAYOUT = '''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Ultimate Intelligence Strategy #{session_id}</title>
+<style>
+body {{ background: linear-gradient(135deg, #000 0%, #1a1a1a 100%); color: #fff; font-family: Arial, sans-serif; max-width: 1400px; margin: 0 auto; padding: 20px; line-height: 1.6; }}
+.container {{ background: linear-gradient(135deg, #1a1a1a 0%, #2d2d2d 100%); padding: 40px; border-radius: 15px; border: 2px solid #ff6b00; box-shadow: 0 20px 40px rgba(0,0,0,0.5); }}
+.strategy {{ background: #2d2d2d; padding: 30px; border-radius: 10px; white-space: pre-wrap; line-height: 1.8; font-size: 14px; border: 1px solid #ff6b00; max-height: 80vh; overflow-y: auto; }}
+.back-btn {{ background: linear-gradient(135deg, #ff6b00 0%, #ff8500 100%); color: #fff; padding: 15px 25px; text-decoration: none; border-radius: 8px; display: inline-block; margin-top: 25px; font-weight: bold; transition: all 0.3s ease; }}
+.back-btn:hover {{ transform: translateY(-2px); }}
+h2 {{ color: #ff6b00; margin-bottom: 25px; font-size: 24px; text-align: center; }}
+.intelligence-badge {{ background: linear-gradient(135deg, #ff6b00 0%, #ff8500 100%); color: #fff; padding: 10px 20px; border-radius: 20px; display: inline-block; margin-bottom: 20px; font-weight: 700; }}
+.powered-by {{ text-align: center; margin-top: 20px; opacity: 0.8; font-size: 12px; color: #ff6b00; }}
+</style></head><body>
+<div class="container">
+<h2>🧠 Your Ultimate Intelligence Strategy</h2>
+<div class="intelligence-badge">🚀 ULTIMATE AI INTELLIGENCE SYSTEM</div>
+<div class="strategy">'''
+
+RESULT_PAGE_TAIL_LAYOUT = '''</div>
+<div class="powered-by">⚡ Powered by Ultimate E-Volve.ai Intelligence | LVX Labs Innovation</div>
+<a href="/" class="back-btn">← Generate Another Ultimate Strategy</a>
+</div></body></html>'''
+
+# A new section starts at each emoji heading after a blank line
+SECTION_BREAK = re.compile(r'(?<=\n\n)(?=[^\w\s"(✓•])')
+
+STRATEGY_TEMPLATE = CompiledTemplate(STRATEGY_LAYOUT)
+STRATEGY_SECTIONS = [CompiledTemplate(section) for section in SECTION_BREAK.split(STRATEGY_LAYOUT)]
+RESULT_PAGE_HEAD = CompiledTemplate(RESULT_PAGE_HEAD_LAYOUT)
+RESULT_PAGE_TAIL = CompiledTemplate(RESULT_PAGE_TAIL_LAYOUT)
@@ -0,0 +1,141 @@
+# LLM generation path against a local OpenAI-compatible stub server, so no
+# network or API key is needed.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import json
+import time
+import threading
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Metrics flushes go to a throwaway database
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='evolve-test-'), 'test.db')
+
+from llm import LLMGenerator
+from persistence import init_database
+
+init_database()
+
+class StubOpenAI:
+    # Answers /v1/chat/completions after `delay` seconds, or with `status`
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.calls += 1
+                time.sleep(stub.delay)
+                payload = {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": f"STUB STRATEGY {stub.calls}"}
+                    }]
+                }
+                if stub.status != 200:
+                    payload = {"error": {"message": "stub failure", "type": "server_error"}}
+                out = json.dumps(payload).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class LLMGeneratorTest(unittest.TestCase):
+    def generator(self, stub, **options):
+        options.setdefault('timeout', 5)
+        options.setdefault('latency_budget', 2)
+        return LLMGenerator('test-key', base_url=stub.base_url, **options)
+
+    def stub(self, **options):
+        stub = StubOpenAI(**options)
+        self.addCleanup(stub.close)
+        return stub
+
+    def test_returns_model_text(self):
+        stub = self.stub()
+        llm = self.generator(stub)
+        self.assertEqual(llm.generate('key', 'prompt'), 'STUB STRATEGY 1')
+        self.assertEqual(llm.stats["calls"], 1)
+
+    def test_coalesces_identical_requests(self):
+        stub = self.stub(delay=0.3)
+        llm = self.generator(stub)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            texts = list(pool.map(lambda _: llm.generate('same', 'prompt'), range(4)))
+        self.assertEqual(set(texts), {'STUB STRATEGY 1'})
+        self.assertEqual(stub.calls, 1)
+        self.assertEqual(llm.stats["coalesced"], 3)
+
+    def test_falls_back_within_budget(self):
+        stub = self.stub(delay=1.0)
+        llm = self.generator(stub, latency_budget=0.1)
+        start = time.monotonic()
+        self.assertIsNone(llm.generate('slow', 'prompt'))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(llm.stats["timeouts"], 1)
+
+    def test_late_result_is_delivered(self):
+        stub = self.stub(delay=0.3)
+        llm = self.generator(stub, latency_budget=0.05)
+        delivered = threading.Event()
+        results = []
+
+        def on_late_result(text):
+            results.append(text)
+            delivered.set()
+
+        self.assertIsNone(llm.generate('late', 'prompt', on_late_result=on_late_result))
+        self.assertTrue(delivered.wait(2))
+        self.assertEqual(results, ['STUB STRATEGY 1'])
+
+    def test_abandoned_calls_never_reach_the_model(self):
+        # Callers that gave up while queued must not build a paid backlog
+        stub = self.stub(delay=0.5)
+        llm = self.generator(stub, concurrency=1, latency_budget=0.1)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            texts = list(pool.map(lambda i: llm.generate(f'key-{i}', 'prompt', on_late_result=lambda _: None), range(6)))
+        self.assertEqual(texts, [None] * 6)
+        time.sleep(1.2)
+        self.assertEqual(stub.calls, 1)
+        self.assertEqual(llm.stats["skipped"] + llm.stats["shed"], 5)
+
+    def test_queue_is_bounded(self):
+        stub = self.stub(delay=0.5)
+        llm = self.generator(stub, concurrency=1, max_queued=2, latency_budget=0.2)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda i: llm.generate(f'key-{i}', 'prompt'), range(6)))
+        self.assertGreaterEqual(llm.stats["shed"], 3)
+
+    def test_model_errors_fall_back(self):
+        stub = self.stub(status=500)
+        llm = self.generator(stub)
+        self.assertIsNone(llm.generate('broken', 'prompt'))
+        self.assertEqual(llm.stats["errors"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# Admission control state in the shared rate-limit file: token bucket refill
+# and Retry-After math, concurrency slots, and rebuilding on a new layout.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='evolve-test-'), 'test.db')
+
+import ratelimit
+from ratelimit import HEADER, SLOT, RateLimiter
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix='evolve-test-'), 'ratelimit')
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def limiter(self, **options):
+        options.setdefault('per_minute', 60)
+        options.setdefault('burst', 3)
+        options.setdefault('concurrency', 2)
+        options.setdefault('streams', 1)
+        options.setdefault('buckets', 64)
+        return RateLimiter(path=self.path, enabled=True, **options)
+
+    def test_burst_then_retry_after(self):
+        limiter = self.limiter()
+        self.assertEqual([limiter.take('ip:a') for _ in range(3)], [0, 0, 0])
+        # One token per second; the bucket is empty
+        self.assertEqual(limiter.take('ip:a'), 1)
+        self.assertEqual(limiter.take('ip:a', cost=3), 3)
+        # Other clients have their own bucket
+        self.assertEqual(limiter.take('ip:b'), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        limiter = self.limiter()
+        for _ in range(3):
+            limiter.take('ip:a')
+        self.clock.now += 1.5
+        self.assertEqual(limiter.take('ip:a'), 0)
+        # Half a token left: the next whole one is a second away
+        self.assertEqual(limiter.take('ip:a'), 1)
+        self.clock.now += 3600
+        self.assertEqual([limiter.take('ip:a') for _ in range(4)], [0, 0, 0, 1])
+
+    def test_cost_above_tokens_is_refused_without_spending(self):
+        limiter = self.limiter(per_minute=30, burst=10)
+        self.assertEqual(limiter.take('ip:a', cost=4), 0)
+        # 6 tokens left at 0.5/s: 4 more are needed, 8 seconds
+        self.assertEqual(limiter.take('ip:a', cost=10), 8)
+        self.assertEqual(limiter.take('ip:a', cost=6), 0)
+
+    def test_slots_are_capped_and_released(self):
+        limiter = self.limiter()
+        tokens = [limiter.acquire_slot() for _ in range(2)]
+        self.assertNotIn(None, tokens)
+        self.assertIsNone(limiter.acquire_slot())
+        # Event streams have their own pool
+        self.assertIsNotNone(limiter.acquire_slot('events'))
+        self.assertIsNone(limiter.acquire_slot('events'))
+        limiter.release_slot(tokens[0])
+        self.assertIsNotNone(limiter.acquire_slot())
+
+    def test_reclaims_slot_from_dead_pid(self):
+        limiter = self.limiter()
+        limiter.acquire_slot()
+        with limiter._locked() as buf:
+            SLOT.pack_into(buf, HEADER.size + SLOT.size, dead_pid(), self.clock.now)
+        token = limiter.acquire_slot()
+        self.assertEqual(token, (1, self.clock.now))
+        self.assertIsNone(limiter.acquire_slot())
+
+    def test_reclaims_slot_after_timeout(self):
+        limiter = self.limiter()
+        first = limiter.acquire_slot()
+        self.clock.now += ratelimit.RATE_LIMIT_SLOT_TIMEOUT / 2
+        limiter.acquire_slot()
+        self.clock.now += ratelimit.RATE_LIMIT_SLOT_TIMEOUT / 2 + 1
+        token = limiter.acquire_slot()
+        self.assertEqual(token[0], first[0])
+        # The original holder's release must not free the reclaimed slot
+        limiter.release_slot(first)
+        self.assertIsNone(limiter.acquire_slot())
+
+    def test_state_is_shared_through_the_file(self):
+        self.limiter().take('ip:a', cost=3)
+        self.assertEqual(self.limiter().take('ip:a'), 1)
+
+    def test_rebuilds_file_on_header_mismatch(self):
+        limiter = self.limiter()
+        limiter.take('ip:a', cost=3)
+        limiter.acquire_slot()
+        # The file is checked and rebuilt when first used
+        resized = self.limiter(concurrency=3)
+        self.assertEqual(resized.take('ip:a'), 0)
+        self.assertEqual(os.path.getsize(self.path), resized.size)
+        self.assertEqual(len([resized.acquire_slot() for _ in range(3)]), 3)
+        self.assertIsNone(resized.acquire_slot())
+
+if __name__ == '__main__':
+    unittest.main()
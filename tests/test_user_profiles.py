@@ -0,0 +1,82 @@
+# Per-user profile statistics: folding results in and taking re-reported
+# ones back out.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import copy
+import json
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='evolve-test-'), 'test.db')
+
+from user_profiles import _apply, empty_stats, load_stats, summarize
+
+def random_result(rng, category='rpg', audience='casual', hook_types=('question',)):
+    return (rng.random(), rng.random(), rng.randint(1, 10), category, audience, list(hook_types))
+
+class ApplyTest(unittest.TestCase):
+    def test_retraction_restores_stats_exactly(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            stats = empty_stats()
+            for _ in range(rng.randint(1, 20)):
+                _apply(stats, random_result(rng), 1)
+            before = copy.deepcopy(stats)
+            result = random_result(rng, 'fps', 'hardcore', ('story', 'question'))
+            _apply(stats, result, 1)
+            _apply(stats, result, -1)
+            self.assertEqual(stats, before)
+
+    def test_re_report_matches_reporting_once(self):
+        # A re-report retracts the old result and folds the new one
+        rng = random.Random(5)
+        first, second = random_result(rng), random_result(rng)
+        re_reported = empty_stats()
+        _apply(re_reported, first, 1)
+        _apply(re_reported, first, -1)
+        _apply(re_reported, second, 1)
+        reported_once = empty_stats()
+        _apply(reported_once, second, 1)
+        self.assertEqual(re_reported, reported_once)
+
+    def test_means_and_success_counts(self):
+        stats = empty_stats()
+        _apply(stats, (0.2, 0.1, 8, 'rpg', 'casual', ['question']), 1)
+        _apply(stats, (0.4, 0.3, 4, 'rpg', 'hardcore', ['question']), 1)
+        self.assertEqual(stats["count"], 2)
+        self.assertAlmostEqual(stats["mean_engagement"], 0.3)
+        self.assertAlmostEqual(stats["mean_conversion"], 0.2)
+        self.assertAlmostEqual(stats["mean_success"], 6.0)
+        self.assertEqual(stats["categories"]["rpg"], {"count": 2, "successes": 1})
+        self.assertEqual(stats["audiences"]["casual"], {"count": 1, "successes": 1})
+
+    def test_retracting_last_result_empties_groups(self):
+        stats = empty_stats()
+        result = (0.5, 0.5, 9, 'rpg', 'casual', ['question'])
+        _apply(stats, result, 1)
+        _apply(stats, result, -1)
+        self.assertEqual(stats, empty_stats())
+
+    def test_loads_profiles_without_sums(self):
+        legacy = {key: value for key, value in empty_stats().items() if not key.endswith('_sum')}
+        legacy.update(count=2, mean_engagement=0.25, mean_conversion=0.1, mean_success=6.0)
+        stats = load_stats(json.dumps(legacy))
+        self.assertEqual(stats["engagement_sum"], 500000)
+        self.assertEqual(stats["success_sum"], 12000000)
+        _apply(stats, (0.25, 0.1, 6, 'rpg', 'casual', []), 1)
+        self.assertAlmostEqual(stats["mean_engagement"], 0.25)
+
+class SummarizeTest(unittest.TestCase):
+    def test_audience_preference_is_best_success_rate(self):
+        stats = empty_stats()
+        for _ in range(5):
+            _apply(stats, (0.1, 0.1, 2, 'rpg', 'casual', []), 1)
+        _apply(stats, (0.1, 0.1, 9, 'rpg', 'hardcore', []), 1)
+        self.assertEqual(summarize(stats)["audience_preference"], 'hardcore')
+
+if __name__ == '__main__':
+    unittest.main()
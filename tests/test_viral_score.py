@@ -0,0 +1,131 @@
+# Viral model sufficient statistics: sparse folding of +1/-1 training events
+# must match a fit from scratch on the net rows.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='evolve-test-'), 'test.db')
+
+from persistence import get_connection, init_database, record_performance, transaction
+from viral_score import (ViralScoreModel, featurize, performance_target, sparse_features,
+                         training_items)
+
+init_database()
+
+def random_strategy(rng):
+    category = rng.choice(['rpg', 'fps', 'puzzle'])
+    metadata = {
+        "game_industry": rng.choice(['mobile', 'pc', '']),
+        "audience": rng.choice(['casual', 'hardcore']),
+        "hashtags": [f"#tag{rng.randint(0, 40)}" for _ in range(3)],
+        "hooks": [f"hook number {rng.randint(0, 9)}"]
+    }
+    return category, f"grow my game {rng.randint(0, 20)}", metadata
+
+def random_result(rng):
+    return rng.random(), rng.random() / 5, rng.randint(1, 10)
+
+def dense_fit(rows):
+    # Reference: X'WX and X'Wy from dense feature matrices
+    model = ViralScoreModel()
+    for (category, intent, metadata), result in rows:
+        items, weights, audience = training_items(category, intent, metadata)
+        X = featurize(items, category, audience)
+        Xw = X * np.asarray(weights)[:, None]
+        model.A += Xw.T @ X
+        model.b += Xw.T @ np.full(len(items), performance_target(*result))
+    return model
+
+def sparse_fit(model, events):
+    # events: (sign, strategy, result)
+    for sign, (category, intent, metadata), result in events:
+        items, weights, audience = training_items(category, intent, metadata)
+        rows, cols, vals = sparse_features(items, category, audience)
+        model.partial_fit(rows, cols, vals, [performance_target(*result)] * len(items),
+                          [sign * weight for weight in weights])
+
+class PartialFitTest(unittest.TestCase):
+    def test_matches_dense_fit(self):
+        rng = random.Random(1)
+        rows = [(random_strategy(rng), random_result(rng)) for _ in range(30)]
+        model = ViralScoreModel()
+        sparse_fit(model, [(1, strategy, result) for strategy, result in rows])
+        reference = dense_fit(rows)
+        np.testing.assert_allclose(model.A, reference.A, atol=1e-9)
+        np.testing.assert_allclose(model.b, reference.b, atol=1e-9)
+
+    def test_retracted_events_match_net_rows(self):
+        rng = random.Random(2)
+        strategies = [random_strategy(rng) for _ in range(20)]
+        latest, events = {}, []
+        for _ in range(60):
+            index = rng.randrange(len(strategies))
+            result = random_result(rng)
+            if index in latest:
+                events.append((-1, strategies[index], latest[index]))
+            events.append((1, strategies[index], result))
+            latest[index] = result
+        model = ViralScoreModel()
+        sparse_fit(model, events)
+        reference = dense_fit([(strategies[index], result) for index, result in latest.items()])
+        np.testing.assert_allclose(model.A, reference.A, atol=1e-9)
+        np.testing.assert_allclose(model.b, reference.b, atol=1e-9)
+
+class RefreshTest(unittest.TestCase):
+    def setUp(self):
+        with get_connection() as conn, transaction(conn):
+            for table in ('viral_training_log', 'viral_model_snapshot', 'strategy_performance'):
+                conn.execute(f'DELETE FROM {table}')
+
+    def add_strategy(self, strategy_id, strategy):
+        category, intent, metadata = strategy
+        with get_connection() as conn, transaction(conn):
+            conn.execute('''INSERT INTO strategy_performance
+                (strategy_id, user_id, category, intent, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?)''',
+                         (strategy_id, 'user', category, intent, json.dumps(metadata), time.time()))
+
+    def test_re_report_is_not_double_counted(self):
+        rng = random.Random(4)
+        strategies = {f"s{i}": random_strategy(rng) for i in range(5)}
+        for strategy_id, strategy in strategies.items():
+            self.add_strategy(strategy_id, strategy)
+            self.assertTrue(record_performance(strategy_id, *random_result(rng)))
+        final = random_result(rng)
+        self.assertTrue(record_performance('s0', *final))
+
+        model = ViralScoreModel()
+        self.assertEqual(model.refresh(), 7)
+        with get_connection() as conn:
+            results = dict((row[0], row[1:]) for row in conn.execute(
+                'SELECT strategy_id, engagement_rate, conversion_rate, success_rating FROM strategy_performance'))
+        self.assertEqual(results['s0'], final)
+        reference = dense_fit([(strategies[strategy_id], result) for strategy_id, result in results.items()])
+        np.testing.assert_allclose(model.A, reference.A, atol=1e-9)
+        np.testing.assert_allclose(model.b, reference.b, atol=1e-9)
+
+    def test_starts_from_snapshot(self):
+        rng = random.Random(6)
+        strategy = random_strategy(rng)
+        self.add_strategy('s0', strategy)
+        record_performance('s0', *random_result(rng))
+        model = ViralScoreModel()
+        model.refresh()
+        model.save_snapshot()
+
+        restored = ViralScoreModel()
+        self.assertEqual(restored.refresh(), 0)
+        self.assertEqual(restored.watermark, model.watermark)
+        np.testing.assert_array_equal(restored.A, model.A)
+        np.testing.assert_array_equal(restored.weights, model.weights)
+
+if __name__ == '__main__':
+    unittest.main()
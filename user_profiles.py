@@ -0,0 +1,153 @@
+# Per-user learning profiles
+# Every reported strategy result is folded into running per-user statistics
+# (counts, means, per-category / per-hook-type success rates) in O(1), inside
+# the same transaction that records it. Generation reads the compact profile
+# with a single keyed lookup, cached briefly in each worker.
+import os
+import json
+
+from persistence import get_connection
+from strategy_cache import LRUCache
+
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', 60))
+SUCCESS_THRESHOLD = 7
+# Results are summed as integers (rates in millionths), so taking a
+# re-reported result back out restores the sums and means exactly
+RATE_SCALE = 1000000
+
+SELECT_PROFILE_SQL = 'SELECT performance_data FROM user_profiles WHERE user_id = ?'
+SELECT_SUMMARY_SQL = 'SELECT content_style, audience_preferences, success_patterns FROM user_profiles WHERE user_id = ?'
+UPSERT_PROFILE_SQL = '''INSERT INTO user_profiles
+    (user_id, content_style, audience_preferences, success_patterns, performance_data)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        content_style = excluded.content_style,
+        audience_preferences = excluded.audience_preferences,
+        success_patterns = excluded.success_patterns,
+        performance_data = excluded.performance_data'''
+
+HOOK_STYLES = {
+    "secret": "Curiosity-driven",
+    "discovery": "Personal story",
+    "insider": "Insider knowledge",
+    "mistake": "Problem-solving",
+    "challenge": "Experiment-based",
+    "contrarian": "Myth-busting",
+    "shortcut": "Educational",
+    "question": "Interactive"
+}
+
+_profile_cache = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+
+def empty_stats():
+    return {
+        "count": 0,
+        "engagement_sum": 0,
+        "conversion_sum": 0,
+        "success_sum": 0,
+        "mean_engagement": 0.0,
+        "mean_conversion": 0.0,
+        "mean_success": 0.0,
+        "categories": {},
+        "hook_types": {},
+        "audiences": {}
+    }
+
+def _apply(stats, result, sign):
+    # sign=1 folds a result in, sign=-1 takes a previously folded one back out
+    engagement_rate, conversion_rate, success_rating, category, audience, hook_types = result
+    count = stats["count"] + sign
+    for key, value in (("engagement", round(engagement_rate * RATE_SCALE)),
+                       ("conversion", round(conversion_rate * RATE_SCALE)),
+                       ("success", success_rating * RATE_SCALE)):
+        stats[f"{key}_sum"] += sign * value
+        stats[f"mean_{key}"] = stats[f"{key}_sum"] / count / RATE_SCALE if count else 0.0
+    stats["count"] = count
+
+    success = int(success_rating >= SUCCESS_THRESHOLD)
+    for group, names in (("categories", [category]), ("audiences", [audience]), ("hook_types", hook_types)):
+        for name in names:
+            if not name:
+                continue
+            bucket = stats[group].setdefault(name, {"count": 0, "successes": 0})
+            bucket["count"] += sign
+            bucket["successes"] += sign * success
+            if bucket["count"] <= 0:
+                del stats[group][name]
+
+def load_stats(raw):
+    stats = json.loads(raw) if raw else empty_stats()
+    for key in ("engagement", "conversion", "success"):
+        # Profiles written before the sums were kept only have means
+        stats.setdefault(f"{key}_sum", round(stats[f"mean_{key}"] * stats["count"] * RATE_SCALE))
+    return stats
+
+def _best(group):
+    # Highest success rate, ties broken by volume
+    if not group:
+        return None, 0.0
+    name, bucket = max(group.items(), key=lambda item: (item[1]["successes"] / item[1]["count"], item[1]["count"]))
+    return name, bucket["successes"] / bucket["count"]
+
+def summarize(stats):
+    best_category, category_rate = _best(stats["categories"])
+    best_hook_type, hook_rate = _best(stats["hook_types"])
+    best_audience, _ = _best(stats["audiences"])
+    return {
+        "content_style": HOOK_STYLES.get(best_hook_type),
+        "audience_preference": best_audience,
+        "success_patterns": {
+            "best_category": best_category,
+            "best_category_success_rate": round(category_rate, 3),
+            "best_hook_type": best_hook_type,
+            "best_hook_success_rate": round(hook_rate, 3),
+            "tracked_results": stats["count"]
+        }
+    }
+
+def fold_result(conn, strategy, previous, current):
+    # Called inside record_performance's transaction. strategy is
+    # (user_id, category, metadata); previous is None or the result this
+    # strategy reported before, which is replaced rather than double counted.
+    user_id, category, metadata = strategy
+    if not user_id:
+        return
+    metadata = json.loads(metadata or '{}')
+    audience = metadata.get('audience')
+    hook_types = metadata.get('hook_types') or []
+
+    row = conn.execute(SELECT_PROFILE_SQL, (user_id,)).fetchone()
+    stats = load_stats(row[0] if row else None)
+    if previous is not None:
+        _apply(stats, previous + (category, audience, hook_types), -1)
+    _apply(stats, current + (category, audience, hook_types), 1)
+
+    summary = summarize(stats)
+    conn.execute(UPSERT_PROFILE_SQL, (
+        user_id,
+        summary["content_style"],
+        summary["audience_preference"],
+        json.dumps(summary["success_patterns"]),
+        json.dumps(stats)
+    ))
+    _profile_cache.set(user_id, summary)
+
+def get_profile(user_id):
+    # Compact profile summary, or None for users with no reported results
+    if not user_id:
+        return None
+    cached = _profile_cache.get(user_id)
+    if cached is not None:
+        return cached or None
+    with get_connection() as conn:
+        row = conn.execute(SELECT_SUMMARY_SQL, (user_id,)).fetchone()
+    summary = {}
+    if row and row[2]:
+        summary = {
+            "content_style": row[0],
+            "audience_preference": row[1],
+            "success_patterns": json.loads(row[2])
+        }
+    _profile_cache.set(user_id, summary)
+    return summary or None
@@ -0,0 +1,303 @@
+# Viral prediction engine
+# A Bayesian ridge model over hashed text features plus a few hand-tuned
+# signals. Until performance data arrives it scores from the prior weights.
+# Reported results are appended to viral_training_log (re-reports log the old
+# result with sign -1) and each event is folded into the sufficient
+# statistics (X'X, X'y) once, a page at a time from sparse entries. Workers
+# start from the latest persisted snapshot of those statistics, so a boot
+# only folds the events logged since.
+import os
+import re
+import json
+import time
+import zlib
+import math
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from persistence import get_connection, reserve_connections, transaction
+
+HASH_BUCKETS = int(os.getenv('VIRAL_HASH_BUCKETS', 512))
+PRIOR_STRENGTH = float(os.getenv('VIRAL_PRIOR_STRENGTH', 5.0))
+REFRESH_INTERVAL = float(os.getenv('VIRAL_REFRESH_INTERVAL', 30))
+REFRESH_PAGE_SIZE = int(os.getenv('VIRAL_REFRESH_PAGE_SIZE', 200))
+SNAPSHOT_EVERY = int(os.getenv('VIRAL_SNAPSHOT_EVERY', 1000))
+
+KINDS = ('hook', 'hashtag', 'audience', 'content')
+
+# Dense signal columns and their prior weights (score points)
+DENSE_FEATURES = (
+    ('bias', 84.0),
+    ('has_number', 3.0),
+    ('open_loop', 2.0),
+    ('second_person', 1.5),
+    ('power_words', 2.0),
+    ('question', 1.0),
+    ('length_penalty', -3.0),
+    ('trending_tag', 2.0),
+    ('category_tag', 3.0),
+    ('branded_tag', 1.0),
+    ('audience_fit', 8.0),
+    ('general_audience', -2.0),
+    ('focused_intent', 4.0),
+    ('specific_niche', 3.0),
+)
+DENSE_INDEX = {name: i for i, (name, _) in enumerate(DENSE_FEATURES)}
+N_DENSE = len(DENSE_FEATURES)
+N_FEATURES = N_DENSE + HASH_BUCKETS
+
+POWER_WORDS = frozenset(("secret", "discovered", "quiet", "mistake", "never", "stop", "nobody", "exactly", "proven", "wrong", "actually"))
+TRENDING_TAGS = frozenset(("#fyp", "#viral", "#trending", "#contentcreator"))
+BRANDED_TAGS = frozenset(("#lvxlabs", "#metafyzical", "#evolveai", "#cleanenergy"))
+AUDIENCE_CATEGORIES = {
+    "gamers": "gaming",
+    "fitness": "fitness",
+    "entrepreneurs": "business",
+    "students": "lifestyle"
+}
+TOKEN_RE = re.compile(r"[#\w']+")
+
+SELECT_TRAINING_SQL = '''SELECT l.seq, l.sign, l.engagement_rate, l.conversion_rate, l.success_rating,
+    s.category, s.intent, s.metadata
+    FROM viral_training_log l JOIN strategy_performance s ON s.strategy_id = l.strategy_id
+    WHERE l.seq > ?
+    ORDER BY l.seq
+    LIMIT ?'''
+
+SELECT_SNAPSHOT_SQL = 'SELECT config, watermark, observations, a, b FROM viral_model_snapshot WHERE id = 1'
+
+# Only ever moves the snapshot forward
+UPSERT_SNAPSHOT_SQL = '''INSERT INTO viral_model_snapshot (id, config, watermark, observations, a, b)
+    VALUES (1, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        config = excluded.config, watermark = excluded.watermark,
+        observations = excluded.observations, a = excluded.a, b = excluded.b
+    WHERE excluded.config != viral_model_snapshot.config OR excluded.watermark > viral_model_snapshot.watermark'''
+
+def performance_target(engagement_rate, conversion_rate, success_rating):
+    # Rates are fractions (0-1) and success_rating is 1-10; benchmarks are a
+    # 10% engagement rate and a 5% conversion rate
+    engagement = min((engagement_rate or 0) / 0.10, 1.0)
+    conversion = min((conversion_rate or 0) / 0.05, 1.0)
+    success = min(max((success_rating or 0) / 10, 0.0), 1.0)
+    return 100 * (0.4 * engagement + 0.3 * conversion + 0.3 * success)
+
+@lru_cache(maxsize=65536)
+def _bucket(token):
+    return N_DENSE + zlib.crc32(token.encode('utf-8')) % HASH_BUCKETS
+
+@lru_cache(maxsize=16384)
+def _item_features(kind, text, category, audience):
+    # Returns (hashed column indices, column weight, {dense column index: value}).
+    # Cached - the same hashtags and hook templates recur on most requests.
+    tokens = TOKEN_RE.findall(text.lower())
+    columns = [_bucket(f"{kind}:{token}") for token in tokens]
+    columns.append(_bucket(f"{kind}|cat:{category}"))
+    columns.append(_bucket(f"{kind}|aud:{audience}"))
+    dense = {'bias': 1.0}
+
+    if kind == 'hook':
+        dense['has_number'] = float(any(token[0].isdigit() for token in tokens))
+        dense['open_loop'] = float(text.rstrip().endswith('...'))
+        dense['second_person'] = float('you' in tokens or 'your' in tokens)
+        dense['power_words'] = float(min(sum(token in POWER_WORDS for token in tokens), 2))
+        dense['question'] = float('?' in text)
+        dense['length_penalty'] = min(abs(len(tokens) - 12) / 8, 1.0)
+    elif kind == 'hashtag':
+        dense['trending_tag'] = float(text in TRENDING_TAGS)
+        dense['branded_tag'] = float(text in BRANDED_TAGS)
+        dense['category_tag'] = float(not dense['trending_tag'] and not dense['branded_tag'])
+    elif kind == 'audience':
+        dense['audience_fit'] = float(AUDIENCE_CATEGORIES.get(audience) == category)
+        dense['general_audience'] = float(audience == 'general')
+    else:
+        dense['focused_intent'] = float(3 <= len(tokens) <= 12)
+        dense['specific_niche'] = float(' | ' in text)
+    dense = {DENSE_INDEX[name]: value for name, value in dense.items() if value}
+    return tuple(columns), 1.0 / math.sqrt(len(columns)), dense
+
+def sparse_features(items, category, audience):
+    # items: sequence of (kind, text) -> (row, column, value) arrays of the
+    # nonzero entries; scoring from these avoids an (n, N_FEATURES) matrix
+    entries = [_item_entries(kind, text, category, audience) for kind, text in items]
+    cols = np.concatenate([item_cols for item_cols, _ in entries])
+    vals = np.concatenate([item_vals for _, item_vals in entries])
+    rows = np.repeat(np.arange(len(entries)), [len(item_cols) for item_cols, _ in entries])
+    return rows, cols, vals
+
+@lru_cache(maxsize=16384)
+def _item_entries(kind, text, category, audience):
+    columns, weight, dense = _item_features(kind, text, category, audience)
+    cols = np.array(columns + tuple(dense), dtype=np.intp)
+    vals = np.array((weight,) * len(columns) + tuple(dense.values()))
+    return cols, vals
+
+def featurize(items, category, audience):
+    # items: sequence of (kind, text) -> (n, N_FEATURES) float matrix
+    flat, vals = [], []
+    for i, (kind, text) in enumerate(items):
+        columns, weight, dense = _item_features(kind, text, category, audience)
+        offset = i * N_FEATURES
+        flat.extend([offset + column for column in columns])
+        vals.extend([weight] * len(columns))
+        flat.extend([offset + column for column in dense])
+        vals.extend(dense.values())
+    # bincount sums repeated tokens into the same bucket
+    X = np.bincount(flat, weights=vals, minlength=len(items) * N_FEATURES)
+    return X.reshape(len(items), N_FEATURES)
+
+def training_items(category, intent, metadata):
+    # The scored items behind one stored strategy, each with a weight so a
+    # strategy contributes equally to every kind
+    audience = metadata.get('audience', '')
+    game_industry = metadata.get('game_industry', '')
+    hooks = metadata.get('hooks') or []
+    hashtags = metadata.get('hashtags') or []
+    items, weights = [], []
+    for hook in hooks:
+        items.append(('hook', hook))
+        weights.append(1.0 / len(hooks))
+    for tag in hashtags:
+        items.append(('hashtag', tag))
+        weights.append(1.0 / len(hashtags))
+    items.append(('audience', f"{category} {audience}"))
+    weights.append(1.0)
+    items.append(('content', content_text(intent, game_industry)))
+    weights.append(1.0)
+    return items, weights, audience
+
+def pair_entries(rows):
+    # Every (i, j) pair of nonzero entries that share a row, for accumulating
+    # X'WX from sparse entries; entries of a row are contiguous
+    lengths = np.bincount(rows)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    per_entry = lengths[rows]
+    left = np.repeat(np.arange(len(rows)), per_entry)
+    offsets = np.concatenate(([0], np.cumsum(per_entry)[:-1]))
+    right = starts[rows][left] + np.arange(len(left)) - offsets[left]
+    return left, right
+
+def content_text(intent, game_industry):
+    return f"{intent} | {game_industry}" if game_industry else intent
+
+class ViralScoreModel:
+    def __init__(self, prior_strength=PRIOR_STRENGTH):
+        self.prior = np.zeros(N_FEATURES)
+        self.prior[:N_DENSE] = [weight for _, weight in DENSE_FEATURES]
+        # Sufficient statistics of the ridge posterior, starting at the prior
+        self.A = prior_strength * np.eye(N_FEATURES)
+        self.b = prior_strength * self.prior
+        self.weights = self.prior.copy()
+        self.config = f"{N_FEATURES}:{HASH_BUCKETS}:{prior_strength}"
+        self.observations = 0
+        self.watermark = 0
+        self._snapshot_observations = 0
+        self._refresher_pid = None
+        self._lock = threading.Lock()
+
+    def partial_fit(self, rows, cols, vals, y, sample_weight):
+        # Sparse (row, column, value) entries with a target and weight per
+        # row; a negative weight removes rows folded in earlier
+        row_weights = np.asarray(sample_weight, dtype=float)
+        left, right = pair_entries(rows)
+        pair_weights = row_weights[rows[left]] * vals[left] * vals[right]
+        A_delta = np.bincount(cols[left] * N_FEATURES + cols[right], weights=pair_weights,
+                              minlength=N_FEATURES * N_FEATURES)
+        b_delta = np.bincount(cols, weights=(row_weights * np.asarray(y, dtype=float))[rows] * vals,
+                              minlength=N_FEATURES)
+        with self._lock:
+            self.A += A_delta.reshape(N_FEATURES, N_FEATURES)
+            self.b += b_delta
+
+    def solve(self):
+        weights = np.linalg.solve(self.A, self.b)
+        self.weights = weights
+
+    def score(self, X):
+        return np.clip(X @ self.weights, 1, 100)
+
+    def score_items(self, items, category, audience):
+        self.maybe_refresh()
+        rows, cols, vals = sparse_features(items, category, audience)
+        scores = np.bincount(rows, weights=self.weights[cols] * vals, minlength=len(items))
+        return np.clip(scores, 1, 100)
+
+    def maybe_refresh(self):
+        # Refits run on a background thread per worker, never on the request path
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            reserve_connections()
+            threading.Thread(target=self._refresh_loop, name='evolve-viral-refresh', daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh()
+            time.sleep(REFRESH_INTERVAL)
+
+    def refresh(self):
+        # Fold in training events logged since the last refresh, a page at a time
+        folded = 0
+        try:
+            if not self.watermark:
+                self.load_snapshot()
+            while True:
+                with get_connection() as conn:
+                    events = conn.execute(SELECT_TRAINING_SQL, (self.watermark, REFRESH_PAGE_SIZE)).fetchall()
+                if events:
+                    self.fold_events(events)
+                    folded += len(events)
+                if len(events) < REFRESH_PAGE_SIZE:
+                    break
+        except Exception as e:
+            print(f"⚠️ Viral model refresh failed: {e}")
+        if not folded:
+            return 0
+        self.solve()
+        print(f"📊 Viral Prediction Engine updated with {folded} new results ({self.observations} total)")
+        if self.observations - self._snapshot_observations >= SNAPSHOT_EVERY:
+            self.save_snapshot()
+        return folded
+
+    def fold_events(self, events):
+        blocks, targets, weights, offsets = [], [], [], [0]
+        for _, sign, engagement_rate, conversion_rate, success_rating, category, intent, metadata in events:
+            items, item_weights, audience = training_items(category, intent or '', json.loads(metadata or '{}'))
+            blocks.append(sparse_features(items, category, audience))
+            targets.extend([performance_target(engagement_rate, conversion_rate, success_rating)] * len(items))
+            weights.extend(sign * weight for weight in item_weights)
+            offsets.append(offsets[-1] + len(items))
+        rows = np.concatenate([block[0] + offset for block, offset in zip(blocks, offsets)])
+        cols = np.concatenate([block[1] for block in blocks])
+        vals = np.concatenate([block[2] for block in blocks])
+        self.partial_fit(rows, cols, vals, targets, weights)
+        self.observations += len(events)
+        self.watermark = events[-1][0]
+
+    def load_snapshot(self):
+        with get_connection() as conn:
+            row = conn.execute(SELECT_SNAPSHOT_SQL).fetchone()
+        if row is None or row[0] != self.config:
+            return
+        _, watermark, observations, a, b = row
+        with self._lock:
+            self.A = np.frombuffer(a).reshape(N_FEATURES, N_FEATURES).copy()
+            self.b = np.frombuffer(b).copy()
+            self.watermark = watermark
+            self.observations = self._snapshot_observations = observations
+        self.solve()
+
+    def save_snapshot(self):
+        with self._lock:
+            a, b = self.A.tobytes(), self.b.tobytes()
+            watermark, observations = self.watermark, self.observations
+        with get_connection() as conn, transaction(conn):
+            conn.execute(UPSERT_SNAPSHOT_SQL, (self.config, watermark, observations, a, b))
+        self._snapshot_observations = observations
+
+viral_model = ViralScoreModel()